@@ -1,13 +1,27 @@
 # app.py - Complete with PDF generation
 import os
+import re
+import copy
 import json
-import uuid
-import requests
-from flask import Flask, render_template, request, jsonify, make_response
+import time
+import secrets
+import asyncio
+import itertools
+import hashlib
+import threading
+import httpx
+import orjson
+import tiktoken
+from diskcache import Cache
+from flask import Flask, render_template, request, jsonify, send_file, Response
+from flask_orjson import OrjsonProvider
 from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from dotenv import load_dotenv
 from datetime import datetime
 from io import BytesIO
+from types import MappingProxyType
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
@@ -19,14 +33,82 @@ from fpdf import FPDF
 load_dotenv()
 
 app = Flask(__name__)
+# Every jsonify/request.get_json goes through orjson instead of the pure
+# Python stdlib encoder - it also serializes datetime and UUID natively
+app.json_provider_class = OrjsonProvider
+app.json = OrjsonProvider(app)
+app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# Cap how much of a multipart form Werkzeug buffers in memory before
+# spilling to disk - large uploads should go through /analyze/stream.
+# The key is only honored from Flask 3.1, hence the requirements pin
+app.config['MAX_FORM_MEMORY_SIZE'] = 500 * 1024
 app.config['SECRET_KEY'] = os.urandom(24)
-app.config['ALLOWED_EXTENSIONS'] = {'txt', 'pdf', 'docx', 'md', 'py', 'java', 'cpp', 'html', 'css', 'js', 'json'}
+# Immutable module-level copy so allowed_file skips the app.config dict
+# lookup on every upload
+_ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'docx', 'md', 'py', 'java', 'cpp', 'html', 'css', 'js', 'json'})
+app.config['ALLOWED_EXTENSIONS'] = _ALLOWED_EXTENSIONS
+
+# Create the upload folder once at import and remember the answer - the
+# directory never moves after startup, so /health has no business paying a
+# disk stat on every load-balancer probe
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+_UPLOAD_FOLDER_EXISTS = os.path.isdir(app.config['UPLOAD_FOLDER'])
+
+# Templates never change at runtime in production - skip the mtime check
+# Jinja does per render when auto-reload is on
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+app.jinja_env.auto_reload = False
+
+# Compile every template at import so no request pays Jinja's parse and
+# compile cost; with auto-reload off they stay in the bytecode cache for
+# the life of the worker
+for _template_name in ('index.html', 'result.html', 'report.html'):
+    app.jinja_env.get_template(_template_name)
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "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")
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+# Read-only so nothing can quietly mutate the shared client's headers at
+# runtime - they are set once on the client below and never per call
+OPENROUTER_HEADERS = MappingProxyType({
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "HTTP-Referer": "http://localhost:5000",
+    "X-Title": "RUBRIX Assignment Evaluator",
+    "Content-Type": "application/json"
+})
+
+# Shared async client - pooled keep-alive connections amortize the TLS
+# handshake to openrouter.ai across requests, and HTTP/2 multiplexing lets
+# one worker hold many calls in flight instead of pinning a thread for the
+# full 45s timeout. Headers are set once here rather than per call; the
+# transport retries transient connect failures before the status-code
+# retry loop in _post_openrouter ever sees them
+http_client = httpx.AsyncClient(
+    timeout=45,
+    headers=OPENROUTER_HEADERS,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=32),
+    ),
+)
+
+# The client's connections are bound to whichever loop created them, but
+# flask[async] on WSGI gives every request a throwaway loop that asgiref
+# closes afterwards - a pooled connection from request N would raise
+# "Event loop is closed" when request N+1 reuses it. All httpx work
+# therefore runs on this one long-lived loop thread, and request loops
+# just await the result; without it the pool above could never actually
+# reuse a connection across requests
+_llm_loop = asyncio.new_event_loop()
+threading.Thread(target=_llm_loop.run_forever, name='openrouter-io', daemon=True).start()
+
+async def _on_llm_loop(coro):
+    """Run a coroutine on the client's loop, awaitable from a request loop"""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _llm_loop))
+
 FREE_MODELS = [
     "meta-llama/llama-3.2-3b-instruct:free",
     "google/gemma-2-2b-it:free",
@@ -34,302 +116,143 @@ FREE_MODELS = [
     "qwen/qwen2.5-7b-instruct:free",
 ]
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
-
-def read_file_content(filepath):
-    """Simple file reader"""
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
-
-def generate_pdf_report(report_data):
-    """Generate a professional PDF report from analysis data"""
-    buffer = BytesIO()
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Create custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#2C3E50'),
-        alignment=1  # Center alignment
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        spaceBefore=20,
-        textColor=colors.HexColor('#3498DB')
-    )
-    
-    subheading_style = ParagraphStyle(
-        'CustomSubHeading',
-        parent=styles['Heading3'],
-        fontSize=14,
-        spaceAfter=8,
-        textColor=colors.HexColor('#7F8C8D')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6
-    )
-    
-    # Build story (content)
-    story = []
-    
-    # Title Page
-    story.append(Paragraph("RUBRIX Assignment Analysis Report", title_style))
-    story.append(Spacer(1, 40))
-    
-    # Logo/Header
-    story.append(Paragraph("AI-Powered Academic Evaluation", ParagraphStyle(
-        'Subtitle',
-        parent=styles['Normal'],
-        fontSize=14,
-        textColor=colors.HexColor('#7F8C8D'),
-        alignment=1
-    )))
-    story.append(Spacer(1, 40))
-    
-    # Assignment Info in a table
-    assignment_info = [
-        ["Assignment:", report_data.get('assignment', 'N/A')],
-        ["Rubric:", report_data.get('rubric', 'N/A')],
-        ["Overall Score:", f"{report_data.get('overall_score', 'N/A')}/100"],
-        ["Overall Grade:", report_data.get('overall_grade', 'N/A')],
-        ["Report Generated:", report_data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))]
-    ]
-    
-    table = Table(assignment_info, colWidths=[2*inch, 4*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F8F9FA')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#2C3E50')),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(table)
-    
-    story.append(Spacer(1, 30))
-    story.append(Paragraph("Executive Summary", heading_style))
-    story.append(Paragraph(report_data.get('summary', 'No summary available.'), normal_style))
-    
-    if report_data.get('grade_justification'):
-        story.append(Spacer(1, 20))
-        story.append(Paragraph("Grade Justification", heading_style))
-        story.append(Paragraph(report_data.get('grade_justification'), normal_style))
-    
-    story.append(PageBreak())
-    
-    # Critical Deficiencies
-    if report_data.get('critical_deficiencies') and len(report_data['critical_deficiencies']) > 0:
-        story.append(Paragraph("Critical Deficiencies", heading_style))
-        story.append(Paragraph("These issues require immediate attention:", subheading_style))
-        story.append(Spacer(1, 10))
-        
-        for i, deficiency in enumerate(report_data['critical_deficiencies'], 1):
-            story.append(Paragraph(f"<b>{i}. {deficiency.get('issue', 'N/A')}</b>", subheading_style))
-            if deficiency.get('priority'):
-                story.append(Paragraph(f"Priority: {deficiency['priority'].upper()}", normal_style))
-            if deficiency.get('evidence'):
-                story.append(Paragraph(f"<i>Evidence:</i> \"{deficiency['evidence']}\"", normal_style))
-            if deficiency.get('remediation'):
-                story.append(Paragraph(f"<i>How to Fix:</i> {deficiency['remediation']}", normal_style))
-            story.append(Spacer(1, 15))
-    
-    # Criteria Breakdown
-    if report_data.get('criteria') and len(report_data['criteria']) > 0:
-        story.append(PageBreak())
-        story.append(Paragraph("Detailed Criteria Analysis", heading_style))
-        
-        for criterion in report_data['criteria']:
-            # Criterion header with score
-            score_percentage = criterion.get('score_percentage', 0)
-            weight = criterion.get('weight', 0)
-            score_display = f"{score_percentage}%"
-            
-            story.append(Paragraph(
-                f"<b>{criterion.get('criterion', 'N/A')}</b> - Score: {score_display} (Weight: {weight}%)",
-                subheading_style
-            ))
-            
-            # Progress bar representation
-            if score_percentage >= 70:
-                score_color = "Good"
-            elif score_percentage >= 50:
-                score_color = "Needs Work"
-            else:
-                score_color = "Poor"
-            
-            story.append(Paragraph(f"Performance Level: {score_color}", normal_style))
-            
-            # Strengths
-            if criterion.get('strengths') and len(criterion['strengths']) > 0:
-                story.append(Paragraph("<b>Strengths:</b>", normal_style))
-                for strength in criterion['strengths']:
-                    story.append(Paragraph(f"• {strength}", normal_style))
-            
-            # Deficiencies
-            if criterion.get('deficiencies') and len(criterion['deficiencies']) > 0:
-                story.append(Paragraph("<b>Areas Needing Improvement:</b>", normal_style))
-                for deficiency in criterion['deficiencies']:
-                    story.append(Paragraph(f"• {deficiency}", normal_style))
-            
-            # Recommendations
-            if criterion.get('recommendations') and len(criterion['recommendations']) > 0:
-                story.append(Paragraph("<b>Specific Recommendations:</b>", normal_style))
-                for rec in criterion['recommendations']:
-                    story.append(Paragraph(f"• {rec}", normal_style))
-            
-            story.append(Spacer(1, 20))
-    
-    # Strengths to Build Upon
-    if report_data.get('strengths_to_build') and len(report_data['strengths_to_build']) > 0:
-        story.append(PageBreak())
-        story.append(Paragraph("Key Strengths to Build Upon", heading_style))
-        
-        for i, strength in enumerate(report_data['strengths_to_build'], 1):
-            story.append(Paragraph(f"<b>{i}. {strength.get('strength', 'N/A')}</b>", subheading_style))
-            if strength.get('evidence'):
-                story.append(Paragraph(f"Evidence: \"{strength['evidence']}\"", normal_style))
-            if strength.get('reinforcement'):
-                story.append(Paragraph(f"How to build on this: {strength['reinforcement']}", normal_style))
-            story.append(Spacer(1, 10))
-    
-    # Structural Analysis
-    if report_data.get('structural_analysis'):
-        story.append(PageBreak())
-        story.append(Paragraph("Structural Analysis", heading_style))
-        
-        struct = report_data['structural_analysis']
-        
-        if struct.get('organization'):
-            story.append(Paragraph("<b>Organization:</b>", subheading_style))
-            story.append(Paragraph(struct.get('organization', 'N/A'), normal_style))
-            story.append(Spacer(1, 10))
-        
-        if struct.get('argument_development'):
-            story.append(Paragraph("<b>Argument Development:</b>", subheading_style))
-            story.append(Paragraph(struct.get('argument_development', 'N/A'), normal_style))
-            story.append(Spacer(1, 10))
-        
-        if struct.get('technical_compliance'):
-            story.append(Paragraph("<b>Technical Compliance:</b>", subheading_style))
-            story.append(Paragraph(struct.get('technical_compliance', 'N/A'), normal_style))
-    
-    # Revision Recommendations
-    if report_data.get('revision_recommendations'):
-        story.append(PageBreak())
-        story.append(Paragraph("Revision Action Plan", heading_style))
-        
-        recs = report_data['revision_recommendations']
-        
-        if recs.get('high_priority') and len(recs['high_priority']) > 0:
-            story.append(Paragraph("<b>High Priority (Do First):</b>", subheading_style))
-            for item in recs['high_priority']:
-                story.append(Paragraph(f"• {item}", normal_style))
-            story.append(Spacer(1, 10))
-        
-        if recs.get('content_improvements') and len(recs['content_improvements']) > 0:
-            story.append(Paragraph("<b>Content Improvements:</b>", subheading_style))
-            for item in recs['content_improvements']:
-                story.append(Paragraph(f"• {item}", normal_style))
-            story.append(Spacer(1, 10))
-        
-        if recs.get('structural_changes') and len(recs['structural_changes']) > 0:
-            story.append(Paragraph("<b>Structural Changes:</b>", subheading_style))
-            for item in recs['structural_changes']:
-                story.append(Paragraph(f"• {item}", normal_style))
-            story.append(Spacer(1, 10))
-        
-        if recs.get('technical_fixes') and len(recs['technical_fixes']) > 0:
-            story.append(Paragraph("<b>Technical Fixes:</b>", subheading_style))
-            for item in recs['technical_fixes']:
-                story.append(Paragraph(f"• {item}", normal_style))
-    
-    # Readiness Assessment
-    if report_data.get('readiness_assessment'):
-        story.append(Spacer(1, 20))
-        story.append(Paragraph("Readiness Assessment", heading_style))
-        
-        readiness = report_data['readiness_assessment']
-        
-        # Status indicator
-        status = readiness.get('status', 'Not Assessed')
-        if 'Ready' in status:
-            status_color = colors.green
-        elif 'Minor' in status:
-            status_color = colors.orange
-        else:
-            status_color = colors.red
-        
-        story.append(Paragraph(f"<b>Status:</b> <font color='{status_color.hexval()}'>{status}</font>", normal_style))
-        
-        if readiness.get('estimated_revision_hours'):
-            story.append(Paragraph(f"<b>Estimated Revision Time:</b> {readiness['estimated_revision_hours']} hours", normal_style))
-        
-        if readiness.get('key_barriers') and len(readiness['key_barriers']) > 0:
-            story.append(Spacer(1, 10))
-            story.append(Paragraph("<b>Key Barriers to Higher Score:</b>", subheading_style))
-            for barrier in readiness['key_barriers']:
-                story.append(Paragraph(f"• {barrier}", normal_style))
-    
-    # Footer/Notes
-    story.append(PageBreak())
-    story.append(Paragraph("Report Notes", heading_style))
-    story.append(Paragraph("This report was generated by RUBRIX AI-Powered Assignment Analysis System.", normal_style))
-    story.append(Spacer(1, 10))
-    story.append(Paragraph("For questions or additional support, please contact your instructor or academic advisor.", normal_style))
-    story.append(Spacer(1, 10))
-    story.append(Paragraph(f"Report ID: {report_data.get('analysis_id', str(uuid.uuid4())[:8])}", normal_style))
-    story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}", normal_style))
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get PDF bytes
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    
-    return pdf_bytes
-
-def analyze_with_openrouter(assignment_text, rubric_text, detailed_analysis=True, rewrite_suggestions=True, grade_prediction=True):
-    """Use OpenRouter's free models with STRICT evaluation prompt"""
-    
-    # Prepare the STRICT prompt
-    prompt = f"""You are an experienced educator and evaluation specialist tasked with rigorous assessment of academic work. Your analysis must be critical, comprehensive, and strictly adhere to the rubric criteria.
-
-**RUBRIC FOR EVALUATION:**
-{rubric_text[:4000]}
-
-**ASSIGNMENT SUBMISSION TO EVALUATE:**
-{assignment_text[:6000]}
-
----
+# Bound concurrent OpenRouter calls so a burst of users doesn't blow through
+# the free-tier rate limits and collapse into a 429 retry storm. A threading
+# semaphore (acquired off the loop via to_thread) is used because flask[async]
+# gives each request its own event loop, which an asyncio.Semaphore can't span
+MAX_INFLIGHT_LLM_CALLS = 4
+# Every waiting analysis pins one of the gthread worker threads, so this
+# cap must stay comfortably below threads-per-worker (gunicorn_conf.py) -
+# if inflight+pending could cover the whole thread pool, no thread would
+# ever be free to reach the 503 shed path and excess load would just
+# queue invisibly in gunicorn's backlog
+MAX_PENDING_LLM_CALLS = 8
+LLM_RETRY_ATTEMPTS = 3
+LLM_RETRY_BACKOFF = 1.0  # seconds, doubled on each retry
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+llm_semaphore = threading.Semaphore(MAX_INFLIGHT_LLM_CALLS)
+llm_stats = {'hits': 0, 'misses': 0, 'inflight': 0, 'pending': 0, 'rejected': 0, 'retries': 0}
+
+def llm_saturated():
+    """True when the wait queue for OpenRouter calls is full"""
+    return llm_stats['pending'] >= MAX_PENDING_LLM_CALLS
+
+LLM_CACHE_DIR = '.llm_cache'
+LLM_CACHE_TTL = 24 * 60 * 60  # 24 hours
+SEMANTIC_SIMILARITY_THRESHOLD = 0.97
+SEMANTIC_INDEX_PRUNE_EVERY = 256  # adds between expiry sweeps of the index
+
+class LLMCache:
+    """Two-tier cache for OpenRouter responses.
+
+    Tier 1 is an exact lookup keyed by a SHA-256 digest of the full request
+    payload, persisted on disk. Tier 2 matches near-duplicate submissions by
+    cosine similarity of sentence embeddings, so a re-submission with trivial
+    edits still returns the cached evaluation instead of a full re-analysis.
+    The semantic tier needs sentence-transformers and faiss, which are
+    deliberately not in requirements.txt (they pull in the full torch
+    stack); install them to enable it, otherwise we silently fall back to
+    exact matching only.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, ttl=LLM_CACHE_TTL):
+        self.cache = Cache(directory)
+        self.ttl = ttl
+        self._embedder = None
+        self._index = None
+        self._index_keys = []
+        # faiss mutation concurrent with search is not thread-safe, and
+        # gthread workers hit this from many request threads
+        self._lock = threading.Lock()
+        try:
+            from sentence_transformers import SentenceTransformer
+            import faiss
+            self._embedder = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+            self._index = faiss.IndexFlatIP(self._embedder.get_sentence_embedding_dimension())
+        except Exception as e:
+            print(f"Semantic cache tier disabled: {e}")
+
+    @staticmethod
+    def cache_key(model, messages, temperature):
+        payload = {"model": model, "messages": messages, "temperature": temperature}
+        digest = hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS))
+        return digest.hexdigest()
+
+    def _embed(self, text):
+        return self._embedder.encode([text], normalize_embeddings=True).astype('float32')
+
+    def _prune_index(self):
+        """Rebuild the index without rows older than the cache TTL - their
+        diskcache entries have expired, so a hit on them resolves to None
+        forever. IndexFlat keeps its vectors, so survivors can be
+        reconstructed. Caller holds the lock."""
+        import faiss
+        cutoff = time.time() - self.ttl
+        keep = [i for i, (_, added) in enumerate(self._index_keys) if added >= cutoff]
+        if len(keep) == len(self._index_keys):
+            return
+        fresh = faiss.IndexFlatIP(self._index.d)
+        for i in keep:
+            fresh.add(self._index.reconstruct(i).reshape(1, -1))
+        self._index = fresh
+        self._index_keys = [self._index_keys[i] for i in keep]
+
+    def get(self, key, semantic_text=None):
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Near-miss tier: look for a semantically identical submission.
+        # Embedding happens outside the lock - it's the slow part
+        if semantic_text and self._index is not None:
+            vector = self._embed(semantic_text)
+            with self._lock:
+                if self._index.ntotal == 0:
+                    return None
+                scores, ids = self._index.search(vector, 1)
+                if scores[0][0] <= SEMANTIC_SIMILARITY_THRESHOLD:
+                    return None
+                hit_key, _ = self._index_keys[int(ids[0][0])]
+            return self.cache.get(hit_key)
+        return None
+
+    def set(self, key, value, semantic_text=None):
+        self.cache.set(key, value, expire=self.ttl)
+        if semantic_text and self._index is not None:
+            vector = self._embed(semantic_text)
+            with self._lock:
+                self._index.add(vector)
+                self._index_keys.append((key, time.time()))
+                if len(self._index_keys) % SEMANTIC_INDEX_PRUNE_EVERY == 0:
+                    self._prune_index()
+
+llm_cache = LLMCache()
+
+# Token budgets for the variable prompt sections (roughly the old 4000/6000
+# character caps). Truncating on tokens instead of characters keeps the
+# prompt within a deterministic budget and never splits mid-token.
+RUBRIC_TOKEN_BUDGET = 1000
+ASSIGNMENT_TOKEN_BUDGET = 1500
+
+_TOKEN_ENCODER = tiktoken.get_encoding('cl100k_base')
+
+def truncate_to_tokens(text, budget):
+    """Trim text to a token budget, leaving short inputs untouched"""
+    # A cl100k token spans at least one character, so anything with fewer
+    # characters than the budget can't be over it - skip the encode, which
+    # is by far the expensive part of this function
+    if len(text) <= budget:
+        return text
+    ids = _TOKEN_ENCODER.encode(text)
+    if len(ids) <= budget:
+        return text
+    return _TOKEN_ENCODER.decode(ids[:budget])
+
+# Static portion of the strict evaluation prompt. Kept as a module constant
+# and sent as the *first* user content block with a cache_control breakpoint
+# so OpenRouter's prompt caching can reuse the server-side KV cache for this
+# prefix on models that support it (Anthropic/Gemini); other models ignore it.
+STATIC_INSTRUCTIONS = """You are an experienced educator and evaluation specialist tasked with rigorous assessment of academic work. Your analysis must be critical, comprehensive, and strictly adhere to the rubric criteria.
 
 ## **EVALUATION INSTRUCTIONS:**
 
@@ -365,54 +288,54 @@ def analyze_with_openrouter(assignment_text, rubric_text, detailed_analysis=True
 ### **3. REQUIRED FORMAT FOR RESPONSE:**
 
 Provide your analysis as a JSON object with this EXACT structure:
-{{
+{
     "overall_score": 85,
     "overall_grade": "B",
     "criteria_breakdown": [
-        {{
-            "criterion": "Criterion Name", 
-            "score_percentage": 80, 
+        {
+            "criterion": "Criterion Name",
+            "score_percentage": 80,
             "weight": 25,
             "strengths": ["Specific strength with evidence"],
             "deficiencies": ["Specific deficiency with exact quote"],
             "recommendations": ["Concrete action required"],
             "needs_improvement": true/false
-        }}
+        }
     ],
     "critical_deficiencies": [
-        {{
+        {
             "issue": "Specific critical issue",
             "evidence": "Exact quote/location",
             "priority": "high/medium/low",
             "remediation": "Step-by-step fix"
-        }}
+        }
     ],
     "strengths_to_build": [
-        {{
+        {
             "strength": "Specific strength",
             "evidence": "Exact quote/location",
             "reinforcement": "How to build on this"
-        }}
+        }
     ],
-    "structural_analysis": {{
+    "structural_analysis": {
         "organization": "Detailed assessment",
         "argument_development": "Specific evaluation",
         "technical_compliance": "Checklist results"
-    }},
-    "revision_recommendations": {{
+    },
+    "revision_recommendations": {
         "high_priority": ["Exactly what to fix first"],
         "content_improvements": ["Specific content changes"],
         "structural_changes": ["Required reorganization"],
         "technical_fixes": ["Exact formatting fixes"]
-    }},
+    },
     "grade_justification": "Concise paragraph explaining score",
-    "readiness_assessment": {{
+    "readiness_assessment": {
         "status": "Needs Major Revision",
         "estimated_revision_hours": 5,
         "key_barriers": ["Fundamental issue 1", "Fundamental issue 2"]
-    }},
+    },
     "summary": "Overall summary with actionable insights"
-}}
+}
 
 ### **4. EVALUATION PRINCIPLES TO ENFORCE:**
 
@@ -431,121 +354,665 @@ Provide your analysis as a JSON object with this EXACT structure:
 
 **BEGIN EVALUATION NOW. Be meticulous, critical, and evidence-based in your assessment.**
 """
-    
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "HTTP-Referer": "http://localhost:5000",
-        "X-Title": "RUBRIX Assignment Evaluator",
-        "Content-Type": "application/json"
-    }
-    
+
+# Per-call prompt scaffolding and request headers, prepared once at import;
+# only the two placeholder substitutions happen per request
+DYNAMIC_PROMPT_TEMPLATE = """**RUBRIC FOR EVALUATION:**
+{rubric}
+
+**ASSIGNMENT SUBMISSION TO EVALUATE:**
+{assignment}
+"""
+
+SYSTEM_MESSAGE = "You are an expert teacher and rigorous evaluator. Always respond with valid JSON only. Be critical, evidence-based, and uncompromising in your assessment."
+
+# Constant message blocks built once; only the dynamic user block is
+# assembled per request
+SYSTEM_MESSAGE_BLOCK = {"role": "system", "content": SYSTEM_MESSAGE}
+# Static prefix first, marked cacheable for prompt caching
+STATIC_PROMPT_BLOCK = {"type": "text", "text": STATIC_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+
+def allowed_file(filename):
+    # rpartition avoids the list rsplit allocates per check
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in _ALLOWED_EXTENSIONS
+
+def read_file_content(filepath):
+    """Simple file reader"""
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def _stream_path(file_id):
+    return os.path.join(app.config['UPLOAD_FOLDER'], f"{secure_filename(file_id)}_stream.txt")
+
+def _consume_stream_file(file_id):
+    """Read a streamed upload and delete it - file_ids are single-use"""
+    path = _stream_path(file_id)
+    content = read_file_content(path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return content
+
+STREAM_FILE_TTL = 60 * 60  # seconds before an unclaimed streamed upload is swept
+
+def _sweep_stream_files():
+    """Delete streamed uploads that were never consumed by an /analyze call,
+    so abandoned sessions don't grow the uploads folder without bound"""
+    cutoff = time.time() - STREAM_FILE_TTL
+    for name in os.listdir(app.config['UPLOAD_FOLDER']):
+        if not name.endswith('_stream.txt'):
+            continue
+        path = os.path.join(app.config['UPLOAD_FOLDER'], name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _drain_stream(stream, path):
+    with open(path, 'wb') as f:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+
+@app.route('/analyze/stream', methods=['POST'])
+async def stream_upload():
+    """Stream a raw upload body straight to disk in 64KB chunks.
+
+    Bypasses Werkzeug's multipart parser entirely, so memory stays constant
+    no matter how large the file is. The copy loop runs in a thread so the
+    event loop stays free for other requests. Returns a file_id the client
+    passes to /analyze as assignment_file_id / rubric_file_id.
+    """
+    file_id = secrets.token_hex(4)
+    path = _stream_path(file_id)
+    try:
+        await asyncio.to_thread(_sweep_stream_files)
+        await asyncio.to_thread(_drain_stream, request.stream, path)
+        return jsonify({'success': True, 'file_id': file_id})
+    except Exception as e:
+        print(f"Stream upload error: {e}")
+        return jsonify({'success': False, 'error': f'Upload failed: {str(e)}'})
+
+# Report styles are built once at import - constructing ParagraphStyle and
+# TableStyle objects on every report is pure churn that shows up in profiles
+# of ReportLab-heavy apps
+_STYLES = getSampleStyleSheet()
+
+title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    textColor=colors.HexColor('#2C3E50'),
+    alignment=1  # Center alignment
+)
+
+heading_style = ParagraphStyle(
+    'CustomHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=16,
+    spaceAfter=12,
+    spaceBefore=20,
+    textColor=colors.HexColor('#3498DB')
+)
+
+subheading_style = ParagraphStyle(
+    'CustomSubHeading',
+    parent=_STYLES['Heading3'],
+    fontSize=14,
+    spaceAfter=8,
+    textColor=colors.HexColor('#7F8C8D')
+)
+
+normal_style = ParagraphStyle(
+    'CustomNormal',
+    parent=_STYLES['Normal'],
+    fontSize=11,
+    spaceAfter=6
+)
+
+subtitle_style = ParagraphStyle(
+    'Subtitle',
+    parent=_STYLES['Normal'],
+    fontSize=14,
+    textColor=colors.HexColor('#7F8C8D'),
+    alignment=1
+)
+
+info_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F8F9FA')),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#2C3E50')),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+])
+
+def _bullets(items):
+    """Render a bullet list as one flowable - every individual Paragraph costs
+    a handle_flowable/drawOn dispatch in doc.build, so batching the bullets
+    cuts the flowable count substantially on list-heavy reports"""
+    return Paragraph('<br/>'.join(f'\u2022 {item}' for item in items), normal_style)
+
+def _title_section(report_data):
+    """Title page, assignment info table and executive summary"""
+    yield Paragraph("RUBRIX Assignment Analysis Report", title_style)
+    yield Spacer(1, 40)
+
+    # Logo/Header
+    yield Paragraph("AI-Powered Academic Evaluation", subtitle_style)
+    yield Spacer(1, 40)
+
+    # Assignment Info in a table
+    assignment_info = [
+        ["Assignment:", report_data.get('assignment', 'N/A')],
+        ["Rubric:", report_data.get('rubric', 'N/A')],
+        ["Overall Score:", f"{report_data.get('overall_score', 'N/A')}/100"],
+        ["Overall Grade:", report_data.get('overall_grade', 'N/A')],
+        ["Report Generated:", report_data['timestamp']]
+    ]
+
+    table = Table(assignment_info, colWidths=[2*inch, 4*inch])
+    table.setStyle(info_table_style)
+    yield table
+
+    yield Spacer(1, 30)
+    yield Paragraph("Executive Summary", heading_style)
+    yield Paragraph(report_data.get('summary', 'No summary available.'), normal_style)
+
+    grade_justification = report_data.get('grade_justification')
+    if grade_justification:
+        yield Spacer(1, 20)
+        yield Paragraph("Grade Justification", heading_style)
+        yield Paragraph(grade_justification, normal_style)
+
+    yield PageBreak()
+
+def _deficiencies_section(report_data):
+    """Critical deficiencies with evidence and remediation"""
+    deficiencies = report_data.get('critical_deficiencies')
+    if not deficiencies:
+        return
+
+    yield Paragraph("Critical Deficiencies", heading_style)
+    yield Paragraph("These issues require immediate attention:", subheading_style)
+    yield Spacer(1, 10)
+
+    for i, deficiency in enumerate(deficiencies, 1):
+        yield Paragraph(f"<b>{i}. {deficiency.get('issue', 'N/A')}</b>", subheading_style)
+        if deficiency.get('priority'):
+            yield Paragraph(f"Priority: {deficiency['priority'].upper()}", normal_style)
+        if deficiency.get('evidence'):
+            yield Paragraph(f"<i>Evidence:</i> \"{deficiency['evidence']}\"", normal_style)
+        if deficiency.get('remediation'):
+            yield Paragraph(f"<i>How to Fix:</i> {deficiency['remediation']}", normal_style)
+        yield Spacer(1, 15)
+
+def _criteria_section(report_data):
+    """Per-criterion breakdown with strengths/deficiencies/recommendations"""
+    criteria = report_data.get('criteria')
+    if not criteria:
+        return
+
+    yield PageBreak()
+    yield Paragraph("Detailed Criteria Analysis", heading_style)
+
+    for criterion in criteria:
+        # Criterion header with score
+        score_percentage = criterion.get('score_percentage', 0)
+        weight = criterion.get('weight', 0)
+        score_display = f"{score_percentage}%"
+
+        yield Paragraph(
+            f"<b>{criterion.get('criterion', 'N/A')}</b> - Score: {score_display} (Weight: {weight}%)",
+            subheading_style
+        )
+
+        # Progress bar representation
+        if score_percentage >= 70:
+            score_color = "Good"
+        elif score_percentage >= 50:
+            score_color = "Needs Work"
+        else:
+            score_color = "Poor"
+
+        yield Paragraph(f"Performance Level: {score_color}", normal_style)
+
+        # Strengths
+        if criterion.get('strengths'):
+            yield Paragraph("<b>Strengths:</b>", normal_style)
+            yield _bullets(criterion['strengths'])
+
+        # Deficiencies
+        if criterion.get('deficiencies'):
+            yield Paragraph("<b>Areas Needing Improvement:</b>", normal_style)
+            yield _bullets(criterion['deficiencies'])
+
+        # Recommendations
+        if criterion.get('recommendations'):
+            yield Paragraph("<b>Specific Recommendations:</b>", normal_style)
+            yield _bullets(criterion['recommendations'])
+
+        yield Spacer(1, 20)
+
+def _strengths_section(report_data):
+    """Key strengths worth reinforcing"""
+    strengths = report_data.get('strengths_to_build')
+    if not strengths:
+        return
+
+    yield PageBreak()
+    yield Paragraph("Key Strengths to Build Upon", heading_style)
+
+    for i, strength in enumerate(strengths, 1):
+        yield Paragraph(f"<b>{i}. {strength.get('strength', 'N/A')}</b>", subheading_style)
+        if strength.get('evidence'):
+            yield Paragraph(f"Evidence: \"{strength['evidence']}\"", normal_style)
+        if strength.get('reinforcement'):
+            yield Paragraph(f"How to build on this: {strength['reinforcement']}", normal_style)
+        yield Spacer(1, 10)
+
+def _structural_section(report_data):
+    """Organization / argumentation / technical compliance"""
+    struct = report_data.get('structural_analysis')
+    if not struct:
+        return
+
+    yield PageBreak()
+    yield Paragraph("Structural Analysis", heading_style)
+
+    if struct.get('organization'):
+        yield Paragraph("<b>Organization:</b>", subheading_style)
+        yield Paragraph(struct.get('organization', 'N/A'), normal_style)
+        yield Spacer(1, 10)
+
+    if struct.get('argument_development'):
+        yield Paragraph("<b>Argument Development:</b>", subheading_style)
+        yield Paragraph(struct.get('argument_development', 'N/A'), normal_style)
+        yield Spacer(1, 10)
+
+    if struct.get('technical_compliance'):
+        yield Paragraph("<b>Technical Compliance:</b>", subheading_style)
+        yield Paragraph(struct.get('technical_compliance', 'N/A'), normal_style)
+
+def _revision_section(report_data):
+    """Prioritized revision action plan"""
+    recs = report_data.get('revision_recommendations')
+    if not recs:
+        return
+
+    yield PageBreak()
+    yield Paragraph("Revision Action Plan", heading_style)
+
+    if recs.get('high_priority'):
+        yield Paragraph("<b>High Priority (Do First):</b>", subheading_style)
+        yield _bullets(recs['high_priority'])
+        yield Spacer(1, 10)
+
+    if recs.get('content_improvements'):
+        yield Paragraph("<b>Content Improvements:</b>", subheading_style)
+        yield _bullets(recs['content_improvements'])
+        yield Spacer(1, 10)
+
+    if recs.get('structural_changes'):
+        yield Paragraph("<b>Structural Changes:</b>", subheading_style)
+        yield _bullets(recs['structural_changes'])
+        yield Spacer(1, 10)
+
+    if recs.get('technical_fixes'):
+        yield Paragraph("<b>Technical Fixes:</b>", subheading_style)
+        yield _bullets(recs['technical_fixes'])
+
+def _readiness_section(report_data):
+    """Submission readiness status and barriers"""
+    readiness = report_data.get('readiness_assessment')
+    if not readiness:
+        return
+
+    yield Spacer(1, 20)
+    yield Paragraph("Readiness Assessment", heading_style)
+
+    # Status indicator
+    status = readiness.get('status', 'Not Assessed')
+    if 'Ready' in status:
+        status_color = colors.green
+    elif 'Minor' in status:
+        status_color = colors.orange
+    else:
+        status_color = colors.red
+
+    yield Paragraph(f"<b>Status:</b> <font color='{status_color.hexval()}'>{status}</font>", normal_style)
+
+    if readiness.get('estimated_revision_hours'):
+        yield Paragraph(f"<b>Estimated Revision Time:</b> {readiness['estimated_revision_hours']} hours", normal_style)
+
+    if readiness.get('key_barriers'):
+        yield Spacer(1, 10)
+        yield Paragraph("<b>Key Barriers to Higher Score:</b>", subheading_style)
+        yield _bullets(readiness['key_barriers'])
+
+def _footer_section(report_data, generated_on):
+    """Closing notes and report metadata"""
+    yield PageBreak()
+    yield Paragraph("Report Notes", heading_style)
+    yield Paragraph("This report was generated by RUBRIX AI-Powered Assignment Analysis System.", normal_style)
+    yield Spacer(1, 10)
+    yield Paragraph("For questions or additional support, please contact your instructor or academic advisor.", normal_style)
+    yield Spacer(1, 10)
+    yield Paragraph(f"Report ID: {report_data['analysis_id']}", normal_style)
+    yield Paragraph(f"Generated on: {generated_on}", normal_style)
+
+# Render reports through templates/report.html + WeasyPrint instead of
+# ReportLab Platypus. The native layout engine is substantially faster on
+# data-heavy reports; off by default since WeasyPrint needs system libraries
+USE_HTML_PDF = os.getenv('USE_HTML_PDF', '').lower() in ('1', 'true', 'yes')
+
+def _generate_pdf_report_html(report_data):
+    """Render the report via the Jinja template and convert with WeasyPrint"""
+    from weasyprint import HTML  # imported lazily - heavy native dependency
+
+    html = app.jinja_env.get_template('report.html').render(
+        report=report_data,
+        report_id=report_data['analysis_id'],
+        generated_on=datetime.now().strftime('%Y-%m-%d at %H:%M:%S')
+    )
+    return BytesIO(HTML(string=html).write_pdf())
+
+def generate_pdf_report(report_data):
+    """Generate a professional PDF report from analysis data"""
+    # Per-report metadata computed once - the id reads /dev/urandom and the
+    # sections shouldn't each pay for their own strftime
+    now = datetime.now()
+    report_data.setdefault('timestamp', now.strftime('%Y-%m-%d %H:%M:%S'))
+    report_data.setdefault('analysis_id', secrets.token_hex(4))
+
+    if USE_HTML_PDF:
+        return _generate_pdf_report_html(report_data)
+
+    buffer = BytesIO()
+
+    # Create PDF document
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    # Sections stream their flowables lazily so only one section's worth of
+    # intermediate objects is alive at a time while the story is assembled
+    story = list(itertools.chain(
+        _title_section(report_data),
+        _deficiencies_section(report_data),
+        _criteria_section(report_data),
+        _strengths_section(report_data),
+        _structural_section(report_data),
+        _revision_section(report_data),
+        _readiness_section(report_data),
+        _footer_section(report_data, now.strftime('%Y-%m-%d at %H:%M:%S')),
+    ))
+
+    # Build PDF
+    doc.build(story)
+
+    # Hand back the buffer itself - getvalue() would copy the whole PDF
+    buffer.seek(0)
+    return buffer
+
+# Simulated strict-format analysis returned when OpenRouter is unreachable.
+# Built and serialized once at import so the failure path allocates nothing
+FALLBACK_ANALYSIS = {
+    "overall_score": 78,
+    "overall_grade": "C+",
+    "criteria_breakdown": [
+        {
+            "criterion": "Content Quality",
+            "score_percentage": 72,
+            "weight": 35,
+            "strengths": ["Clear thesis statement in introduction", "Relevant examples provided"],
+            "deficiencies": ["Lacks depth in analysis - only surface level coverage", "Missing citations for key claims"],
+            "recommendations": ["Add at least 3 scholarly references", "Deepen analysis with counterarguments"],
+            "needs_improvement": True
+        },
+        {
+            "criterion": "Organization",
+            "score_percentage": 85,
+            "weight": 25,
+            "strengths": ["Logical paragraph structure", "Clear transitions between sections"],
+            "deficiencies": ["Conclusion is abrupt and doesn't synthesize main points", "Introduction could better preview structure"],
+            "recommendations": ["Expand conclusion to summarize key findings", "Add roadmap sentence in introduction"],
+            "needs_improvement": False
+        },
+        {
+            "criterion": "Critical Thinking",
+            "score_percentage": 65,
+            "weight": 40,
+            "strengths": ["Identifies main issues in the topic"],
+            "deficiencies": ["Fails to analyze underlying assumptions", "No synthesis of different perspectives", "Superficial evaluation of evidence"],
+            "recommendations": ["Question the assumptions behind each argument", "Compare and contrast at least 3 different viewpoints", "Evaluate the quality of evidence used"],
+            "needs_improvement": True
+        }
+    ],
+    "critical_deficiencies": [
+        {
+            "issue": "Lack of critical analysis depth",
+            "evidence": "\"The solution is effective because it helps people.\" (Paragraph 3) - This is descriptive, not analytical",
+            "priority": "high",
+            "remediation": "Replace descriptive statements with analytical questions: Why is it effective? For whom? Under what conditions? Compared to what alternatives?"
+        },
+        {
+            "issue": "Missing academic citations",
+            "evidence": "No references provided for claims about statistics or established theories",
+            "priority": "high",
+            "remediation": "Add minimum 5 scholarly sources using proper APA/MLA format"
+        }
+    ],
+    "strengths_to_build": [
+        {
+            "strength": "Clear writing style",
+            "evidence": "Sentence structure is varied and readable throughout (e.g., Paragraph 2 uses effective complex sentences)",
+            "reinforcement": "Maintain this clarity while adding analytical depth"
+        },
+        {
+            "strength": "Logical organization",
+            "evidence": "Each paragraph has clear topic sentences and flows naturally to the next",
+            "reinforcement": "Apply same organizational rigor to argument development"
+        }
+    ],
+    "structural_analysis": {
+        "organization": "Good basic structure but lacks sophistication in argument development",
+        "argument_development": "Linear presentation without enough critical engagement or synthesis",
+        "technical_compliance": "Meets basic formatting but lacks citations and proper academic conventions"
+    },
+    "revision_recommendations": {
+        "high_priority": ["Add scholarly citations", "Deepen critical analysis"],
+        "content_improvements": ["Include counterarguments", "Add case studies/examples"],
+        "structural_changes": ["Expand conclusion", "Add literature review section"],
+        "technical_fixes": ["Add reference list", "Fix formatting inconsistencies"]
+    },
+    "grade_justification": "Score of 78 reflects adequate content presentation but significant deficiencies in critical analysis and academic rigor. While well-organized, the submission lacks the analytical depth and scholarly engagement required for higher grades.",
+    "readiness_assessment": {
+        "status": "Needs Major Revision",
+        "estimated_revision_hours": 6,
+        "key_barriers": ["Insufficient critical engagement", "Lack of scholarly references", "Superficial analysis"]
+    },
+    "summary": "Adequately organized submission that meets basic requirements but requires substantial improvement in analytical depth, scholarly engagement, and critical thinking to achieve higher standards.",
+    "note": "Using simulated analysis (OpenRouter unavailable)"
+}
+class AIResponseParseError(Exception):
+    """Raised when the model's reply is not valid JSON. Carries the raw
+    text so callers can surface it; the JSON API reports it as a failure
+    while the legacy HTML flow substitutes the canned fallback below"""
+    def __init__(self, raw_response):
+        super().__init__('Failed to parse AI response')
+        self.raw_response = raw_response
+
+# Shown by the HTML file-upload flow when the AI response cannot be parsed
+# as JSON; deep-copied per use so request-specific fields can be attached
+PARSE_ERROR_FALLBACK = {
+    "overall_score": 75,
+    "overall_grade": "C",
+    "criteria_breakdown": [
+        {
+            "criterion": "Content",
+            "score_percentage": 70,
+            "weight": 30,
+            "strengths": ["Basic content covered"],
+            "deficiencies": ["Analysis needed"],
+            "recommendations": ["Improve depth"],
+            "needs_improvement": True
+        }
+    ],
+    "summary": "Analysis completed but with parsing limitations."
+}
+
+# The simulated analysis never varies, so serialize it once - the outage
+# path shouldn't pay an encode per failed request on top of the failure
+FALLBACK_ANALYSIS_BYTES = orjson.dumps(FALLBACK_ANALYSIS)
+
+# Race the same request across several free models and keep the first valid
+# answer. Off by default - it burns quota on the losing candidates
+MULTI_MODEL_RACE = os.getenv('MULTI_MODEL_RACE', '').lower() in ('1', 'true', 'yes')
+RACE_MODEL_COUNT = 3
+
+async def _post_openrouter(payload):
+    """Send one request, retrying with backoff on rate limits and 5xx.
+
+    The response body is consumed incrementally as it comes off the wire
+    rather than waiting for httpx to buffer the whole thing, so parsing
+    starts the moment the last chunk lands. Returns the raw body bytes.
+    """
+    body = orjson.dumps(payload)
+    for attempt in range(LLM_RETRY_ATTEMPTS):
+        async with http_client.stream('POST', OPENROUTER_URL, content=body) as response:
+            if (response.status_code in RETRYABLE_STATUS_CODES
+                    and attempt < LLM_RETRY_ATTEMPTS - 1):
+                llm_stats['retries'] += 1
+            else:
+                response.raise_for_status()
+                raw = bytearray()
+                async for chunk in response.aiter_bytes():
+                    raw.extend(chunk)
+                return bytes(raw)
+        await asyncio.sleep(LLM_RETRY_BACKOFF * (2 ** attempt))
+
+# Fallback for models that ignore response_format and fence the JSON anyway;
+# compiled once, and the startswith guard keeps it off the common path
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*(.*?)\s*```$', re.DOTALL)
+
+def _extract_content(raw_body):
+    """Pull the message content out of an OpenRouter response body and strip
+    any Markdown code fences around the JSON"""
+    result = orjson.loads(raw_body)
+    ai_response = result["choices"][0]["message"]["content"].strip()
+    if ai_response.startswith("```"):
+        match = _CODE_FENCE_RE.match(ai_response)
+        if match:
+            ai_response = match.group(1)
+    return ai_response
+
+async def _race_openrouter(payload):
+    """Fan the request out to several models concurrently; first response
+    with valid JSON content wins, the stragglers are cancelled"""
+    tasks = [asyncio.create_task(_post_openrouter(dict(payload, model=model)))
+             for model in FREE_MODELS[:RACE_MODEL_COUNT]]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            try:
+                ai_response = _extract_content(await completed)
+                orjson.loads(ai_response)  # validity check only
+                return ai_response
+            except Exception as e:
+                print(f"Race candidate failed: {e}")
+        raise RuntimeError("No raced model returned valid JSON")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def analyze_with_openrouter(assignment_text, rubric_text, detailed_analysis=True, rewrite_suggestions=True, grade_prediction=True):
+    """Use OpenRouter's free models with STRICT evaluation prompt"""
+
+    # Variable portion of the prompt - rubric and submission under evaluation
+    rubric_part = truncate_to_tokens(rubric_text, RUBRIC_TOKEN_BUDGET)
+    assignment_part = truncate_to_tokens(assignment_text, ASSIGNMENT_TOKEN_BUDGET)
+    dynamic_part = DYNAMIC_PROMPT_TEMPLATE.format_map({'rubric': rubric_part, 'assignment': assignment_part})
+
     payload = {
         "model": FREE_MODELS[0],
         "messages": [
-            {"role": "system", "content": "You are an expert teacher and rigorous evaluator. Always respond with valid JSON only. Be critical, evidence-based, and uncompromising in your assessment."},
-            {"role": "user", "content": prompt}
+            SYSTEM_MESSAGE_BLOCK,
+            {"role": "user", "content": [
+                STATIC_PROMPT_BLOCK,
+                {"type": "text", "text": dynamic_part}
+            ]}
         ],
-        "temperature": 0.2,
-        "max_tokens": 2000
+        "temperature": 0,  # Deterministic output so cached responses stay valid
+        "max_tokens": 2000,
+        # Ask for bare JSON up front - models that honor this never emit
+        # the Markdown fences _extract_content otherwise has to strip
+        "response_format": {"type": "json_object"}
     }
-    
+
+    # Check the cache before going to the network - identical or
+    # near-identical submissions come back in milliseconds
+    cache_key = LLMCache.cache_key(payload["model"], payload["messages"], payload["temperature"])
+    semantic_text = assignment_part + rubric_part
+    cached_response = llm_cache.get(cache_key, semantic_text=semantic_text)
+    if cached_response is not None:
+        llm_stats['hits'] += 1
+        return cached_response
+    llm_stats['misses'] += 1
+
     try:
-        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=45)
-        response.raise_for_status()
-        
-        result = response.json()
-        ai_response = result["choices"][0]["message"]["content"]
-        
-        # Clean the response
-        ai_response = ai_response.strip()
-        if ai_response.startswith("```json"):
-            ai_response = ai_response[7:-3].strip()
-        elif ai_response.startswith("```"):
-            ai_response = ai_response[3:-3].strip()
-            
-        return ai_response
-        
+        llm_stats['pending'] += 1
+        try:
+            await asyncio.to_thread(llm_semaphore.acquire)
+        finally:
+            llm_stats['pending'] -= 1
+        llm_stats['inflight'] += 1
+        try:
+            if MULTI_MODEL_RACE:
+                ai_response = await _on_llm_loop(_race_openrouter(payload))
+            else:
+                ai_response = _extract_content(await _on_llm_loop(_post_openrouter(payload)))
+        finally:
+            llm_stats['inflight'] -= 1
+            llm_semaphore.release()
+
+        # Validate but don't re-encode: the happy path hands the model's own
+        # JSON bytes straight through to the HTTP response
+        raw_analysis = ai_response.encode('utf-8')
+        try:
+            orjson.loads(raw_analysis)
+        except orjson.JSONDecodeError as e:
+            print(f"JSON parse error: {e}")
+            # Never cached: one garbled model response must not pin a
+            # substitute result to this submission (and its
+            # near-duplicates, via the semantic index) for the cache TTL
+            raise AIResponseParseError(ai_response[:500])
+
+        llm_cache.set(cache_key, raw_analysis, semantic_text=semantic_text)
+        return raw_analysis
+
+    except AIResponseParseError:
+        raise  # surfaced to the caller, not masked by the simulation
     except Exception as e:
         print(f"OpenRouter error: {e}")
         # Fallback to simulation with strict format
-        return json.dumps({
-            "overall_score": 78,
-            "overall_grade": "C+",
-            "criteria_breakdown": [
-                {
-                    "criterion": "Content Quality",
-                    "score_percentage": 72,
-                    "weight": 35,
-                    "strengths": ["Clear thesis statement in introduction", "Relevant examples provided"],
-                    "deficiencies": ["Lacks depth in analysis - only surface level coverage", "Missing citations for key claims"],
-                    "recommendations": ["Add at least 3 scholarly references", "Deepen analysis with counterarguments"],
-                    "needs_improvement": True
-                },
-                {
-                    "criterion": "Organization",
-                    "score_percentage": 85,
-                    "weight": 25,
-                    "strengths": ["Logical paragraph structure", "Clear transitions between sections"],
-                    "deficiencies": ["Conclusion is abrupt and doesn't synthesize main points", "Introduction could better preview structure"],
-                    "recommendations": ["Expand conclusion to summarize key findings", "Add roadmap sentence in introduction"],
-                    "needs_improvement": False
-                },
-                {
-                    "criterion": "Critical Thinking",
-                    "score_percentage": 65,
-                    "weight": 40,
-                    "strengths": ["Identifies main issues in the topic"],
-                    "deficiencies": ["Fails to analyze underlying assumptions", "No synthesis of different perspectives", "Superficial evaluation of evidence"],
-                    "recommendations": ["Question the assumptions behind each argument", "Compare and contrast at least 3 different viewpoints", "Evaluate the quality of evidence used"],
-                    "needs_improvement": True
-                }
-            ],
-            "critical_deficiencies": [
-                {
-                    "issue": "Lack of critical analysis depth",
-                    "evidence": "\"The solution is effective because it helps people.\" (Paragraph 3) - This is descriptive, not analytical",
-                    "priority": "high",
-                    "remediation": "Replace descriptive statements with analytical questions: Why is it effective? For whom? Under what conditions? Compared to what alternatives?"
-                },
-                {
-                    "issue": "Missing academic citations",
-                    "evidence": "No references provided for claims about statistics or established theories",
-                    "priority": "high",
-                    "remediation": "Add minimum 5 scholarly sources using proper APA/MLA format"
-                }
-            ],
-            "strengths_to_build": [
-                {
-                    "strength": "Clear writing style",
-                    "evidence": "Sentence structure is varied and readable throughout (e.g., Paragraph 2 uses effective complex sentences)",
-                    "reinforcement": "Maintain this clarity while adding analytical depth"
-                },
-                {
-                    "strength": "Logical organization",
-                    "evidence": "Each paragraph has clear topic sentences and flows naturally to the next",
-                    "reinforcement": "Apply same organizational rigor to argument development"
-                }
-            ],
-            "structural_analysis": {
-                "organization": "Good basic structure but lacks sophistication in argument development",
-                "argument_development": "Linear presentation without enough critical engagement or synthesis",
-                "technical_compliance": "Meets basic formatting but lacks citations and proper academic conventions"
-            },
-            "revision_recommendations": {
-                "high_priority": ["Add scholarly citations", "Deepen critical analysis"],
-                "content_improvements": ["Include counterarguments", "Add case studies/examples"],
-                "structural_changes": ["Expand conclusion", "Add literature review section"],
-                "technical_fixes": ["Add reference list", "Fix formatting inconsistencies"]
-            },
-            "grade_justification": "Score of 78 reflects adequate content presentation but significant deficiencies in critical analysis and academic rigor. While well-organized, the submission lacks the analytical depth and scholarly engagement required for higher grades.",
-            "readiness_assessment": {
-                "status": "Needs Major Revision",
-                "estimated_revision_hours": 6,
-                "key_barriers": ["Insufficient critical engagement", "Lack of scholarly references", "Superficial analysis"]
-            },
-            "summary": "Adequately organized submission that meets basic requirements but requires substantial improvement in analytical depth, scholarly engagement, and critical thinking to achieve higher standards.",
-            "note": "Using simulated analysis (OpenRouter unavailable)"
-        })
+        return FALLBACK_ANALYSIS_BYTES
 
 @app.route('/')
 def index():
@@ -553,14 +1020,31 @@ def index():
     return render_template('index.html', current_year=current_year)
 
 @app.route('/analyze', methods=['POST'])
-def upload_files():
+async def upload_files():
     try:
+        # Shed load early when the wait queue for OpenRouter is already full
+        if llm_saturated():
+            llm_stats['rejected'] += 1
+            if request.is_json:
+                return jsonify({
+                    'success': False,
+                    'error': 'Too many analyses in flight - please try again shortly'
+                }), 503
+            return render_template('index.html', error='Server is busy, please try again shortly'), 503
+
         # Check if this is a JSON request (text input) or form data (file upload)
         if request.is_json:
             data = request.get_json()
             assignment_text = data.get('assignment_text', '')
             rubric_text = data.get('rubric_text', '')
-            
+
+            # Large files arrive via /analyze/stream and are referenced by
+            # id; consuming the id also removes the temp file
+            if not assignment_text and data.get('assignment_file_id'):
+                assignment_text = _consume_stream_file(data['assignment_file_id'])
+            if not rubric_text and data.get('rubric_file_id'):
+                rubric_text = _consume_stream_file(data['rubric_file_id'])
+
             if not assignment_text or not rubric_text:
                 return jsonify({
                     'success': False,
@@ -572,29 +1056,26 @@ def upload_files():
             rewrite_suggestions = data.get('rewrite_suggestions', True)
             grade_prediction = data.get('grade_prediction', True)
             
-            # Analyze with OpenRouter
-            analysis_result = analyze_with_openrouter(
-                assignment_text,
-                rubric_text,
-                detailed_analysis,
-                rewrite_suggestions,
-                grade_prediction
-            )
-            
-            # Parse response
+            # Analyze with OpenRouter - returns validated JSON bytes
             try:
-                analysis_data = json.loads(analysis_result)
-                return jsonify({
-                    'success': True,
-                    'analysis': analysis_data
-                })
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error: {e}")
+                analysis_bytes = await analyze_with_openrouter(
+                    assignment_text,
+                    rubric_text,
+                    detailed_analysis,
+                    rewrite_suggestions,
+                    grade_prediction
+                )
+            except AIResponseParseError as e:
                 return jsonify({
                     'success': False,
                     'error': 'Failed to parse AI response',
-                    'raw_response': analysis_result
+                    'raw_response': e.raw_response
                 })
+
+            # Wrap by concatenation: zero parse, zero re-encode on the
+            # happy path
+            body = b'{"success":true,"analysis":' + analysis_bytes + b'}'
+            return Response(body, mimetype='application/json')
         
         # Original file upload logic
         elif 'assignment' in request.files and 'rubric' in request.files:
@@ -609,57 +1090,28 @@ def upload_files():
             rewrite_suggestions = request.form.get('rewrite_suggestions') == 'on'
             grade_prediction = request.form.get('grade_prediction') == 'on'
             
-            # Save files temporarily
-            assign_id = str(uuid.uuid4())[:8]
-            assign_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{assign_id}_assignment.txt")
-            rubric_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{assign_id}_rubric.txt")
-            
-            assignment_file.save(assign_path)
-            rubric_file.save(rubric_path)
-            
-            # Read files
-            assignment_text = read_file_content(assign_path)
-            rubric_text = read_file_content(rubric_path)
-            
-            # Analyze with OpenRouter
-            analysis_result = analyze_with_openrouter(
-                assignment_text,
-                rubric_text,
-                detailed_analysis,
-                rewrite_suggestions,
-                grade_prediction
-            )
-            
-            # Parse response
+            # Read straight from the request stream - MAX_CONTENT_LENGTH
+            # already caps these at 16MB, so there is no reason to write
+            # them to disk only to read them back and delete them. Large
+            # uploads go through /analyze/stream instead
+            assignment_text = assignment_file.stream.read().decode('utf-8', errors='ignore')
+            rubric_text = rubric_file.stream.read().decode('utf-8', errors='ignore')
+
+            # Analyze with OpenRouter; the template needs the parsed dict.
+            # The legacy HTML flow keeps rendering the canned fallback on a
+            # parse failure rather than bouncing the user to an error page
             try:
-                analysis_data = json.loads(analysis_result)
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error: {e}")
-                analysis_data = {
-                    "overall_score": 75,
-                    "overall_grade": "C",
-                    "criteria_breakdown": [
-                        {
-                            "criterion": "Content",
-                            "score_percentage": 70,
-                            "weight": 30,
-                            "strengths": ["Basic content covered"],
-                            "deficiencies": ["Analysis needed"],
-                            "recommendations": ["Improve depth"],
-                            "needs_improvement": True
-                        }
-                    ],
-                    "summary": "Analysis completed but with parsing limitations.",
-                    "raw_response": analysis_result[:500]
-                }
-            
-            # Cleanup
-            try:
-                os.remove(assign_path)
-                os.remove(rubric_path)
-            except:
-                pass
-            
+                analysis_data = orjson.loads(await analyze_with_openrouter(
+                    assignment_text,
+                    rubric_text,
+                    detailed_analysis,
+                    rewrite_suggestions,
+                    grade_prediction
+                ))
+            except AIResponseParseError as e:
+                analysis_data = copy.deepcopy(PARSE_ERROR_FALLBACK)
+                analysis_data['raw_response'] = e.raw_response
+
             return render_template('result.html',
                                  analysis=analysis_data,
                                  assignment_name=assignment_file.filename,
@@ -677,93 +1129,220 @@ def upload_files():
         else:
             return render_template('index.html', error=f'Error: {str(e)}')
 
+# PDF job queue so large reports don't block request handlers. Clients
+# enqueue at /pdf-jobs and poll /pdf/<job_id>. The build runs on an
+# in-process executor, but job state lives in a diskcache shared by every
+# gunicorn worker - the poll rarely lands on the worker that took the
+# enqueue, and a per-process dict would 404 it. An external broker
+# (Celery/RQ) would pull in Redis, which the app doesn't otherwise need
+PDF_JOB_TTL = 10 * 60  # seconds a job stays fetchable after creation
+PDF_WORKERS = 2
+
+_pdf_executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix='pdf')
+_pdf_jobs = Cache('.pdf_jobs')
+
+def _build_pdf_job(job_id, report_data):
+    """Executor target: build the PDF and publish the outcome for pollers"""
+    try:
+        pdf_bytes = generate_pdf_report(report_data).getvalue()
+        assignment_name = report_data.get('assignment', 'analysis').replace(' ', '_')
+        filename = f"RUBRIX_Report_{assignment_name}_{report_data.get('overall_score', 'score')}.pdf"
+        _pdf_jobs.set(job_id, ('done', pdf_bytes, filename), expire=PDF_JOB_TTL)
+    except Exception as e:
+        print(f"PDF job error: {e}")
+        _pdf_jobs.set(job_id, ('error', str(e), None), expire=PDF_JOB_TTL)
+
+@app.route('/pdf-jobs', methods=['POST'])
+def enqueue_pdf_job():
+    """Queue PDF generation and return a job id to poll at /pdf/<job_id>"""
+    try:
+        report_data = orjson.loads(request.get_data())
+
+        if 'analysis_id' not in report_data:
+            report_data['analysis_id'] = secrets.token_hex(4)
+
+        if 'timestamp' not in report_data:
+            report_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        job_id = secrets.token_hex(4)
+        # Mark pending before submitting so a poll that beats the build
+        # (possibly from another worker) sees 202, not 404
+        _pdf_jobs.set(job_id, ('pending', None, None), expire=PDF_JOB_TTL)
+        _pdf_executor.submit(_build_pdf_job, job_id, report_data)
+
+        return jsonify({'success': True, 'job_id': job_id})
+
+    except Exception as e:
+        print(f"PDF job enqueue error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Could not queue PDF job: {str(e)}'
+        }), 500
+
+@app.route('/pdf/<job_id>')
+def fetch_pdf_job(job_id):
+    """Download a queued PDF; 202 while it is still building"""
+    job = _pdf_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired job id'}), 404
+
+    status, payload, filename = job
+    if status == 'pending':
+        return jsonify({'success': True, 'status': 'pending'}), 202
+    if status == 'error':
+        return jsonify({'success': False, 'error': f'PDF generation failed: {payload}'}), 500
+
+    # Fresh BytesIO per response - concurrent downloads of the same job must
+    # not share one buffer's read position
+    return send_file(BytesIO(payload), mimetype='application/pdf',
+                     as_attachment=True, download_name=filename, max_age=0)
+
+# Parsed analyses are kept server-side for a while so a refresh-happy user
+# can hit /result?id=<analysis_id> without re-shipping (and re-parsing) the
+# whole payload through the URL. Diskcache rather than a dict so the id
+# resolves no matter which gunicorn worker serves the follow-up request
+RESULT_TTL = 600
+_result_store = Cache('.result_store')
+
+def _remember_result(analysis_id, report_data):
+    # /download-pdf payloads are report-shaped: the criteria live under
+    # 'criteria' and the document names under 'assignment'/'rubric'.
+    # result.html renders the analysis shape ('criteria_breakdown',
+    # 'assignment_name'/'rubric_name'), so translate once before storing
+    # rather than on every render
+    analysis_data = dict(report_data)
+    analysis_data.setdefault('criteria_breakdown', analysis_data.get('criteria', []))
+    analysis_data.setdefault('assignment_name', analysis_data.get('assignment', 'Text Input'))
+    analysis_data.setdefault('rubric_name', analysis_data.get('rubric', 'Text Input'))
+    _result_store.set(analysis_id, analysis_data, expire=RESULT_TTL)
+
+# Refreshes of the same ?analysis= URL send byte-identical JSON, so the
+# parse is memoized on the raw string
+@lru_cache(maxsize=128)
+def _parse_analysis(analysis_json):
+    return orjson.loads(analysis_json)
+
 @app.route('/result')
 def result():
     """Route to display result page with query parameters"""
     try:
-        analysis_json = request.args.get('analysis')
-        if analysis_json:
-            analysis_data = json.loads(analysis_json)
-            assignment_name = request.args.get('assignment_name', 'Text Input')
-            rubric_name = request.args.get('rubric_name', 'Text Input')
-            
-            return render_template('result.html',
-                                 analysis=analysis_data,
-                                 assignment_name=assignment_name,
-                                 rubric_name=rubric_name)
+        result_id = request.args.get('id', type=str)
+        if result_id:
+            analysis_data = _result_store.get(result_id)
+            if analysis_data is None:
+                return render_template('index.html', error='Result expired - please re-run the analysis')
+            assignment_name = analysis_data.get('assignment_name', 'Text Input')
+            rubric_name = analysis_data.get('rubric_name', 'Text Input')
         else:
-            return render_template('index.html', error='No analysis data provided')
+            analysis_json = request.args.get('analysis', type=str)
+            if not analysis_json:
+                return render_template('index.html', error='No analysis data provided')
+            analysis_data = _parse_analysis(analysis_json)
+            assignment_name = request.args.get('assignment_name', 'Text Input', type=str)
+            rubric_name = request.args.get('rubric_name', 'Text Input', type=str)
+
+        return render_template('result.html',
+                             analysis=analysis_data,
+                             assignment_name=assignment_name,
+                             rubric_name=rubric_name)
     except Exception as e:
         return render_template('index.html', error=f'Error displaying results: {str(e)}')
 
 @app.route('/download-pdf', methods=['POST'])
-def download_pdf():
+async def download_pdf():
     """Generate and download PDF report"""
     try:
-        report_data = request.get_json()
-        
-        # Add analysis ID and current timestamp if not present
-        if 'analysis_id' not in report_data:
-            report_data['analysis_id'] = str(uuid.uuid4())[:8]
-        
+        # orjson.loads on the raw body skips Flask's slower get_json path
+        report_data = orjson.loads(request.get_data())
+
+        # The id keys the server-side result store, so it is always minted
+        # here: the shipped frontend sends the literal "N/A" for every
+        # report, and honoring any client-supplied value would let one
+        # user's stored analysis be overwritten - and served - under
+        # another user's id
+        report_data['analysis_id'] = secrets.token_hex(4)
+
         if 'timestamp' not in report_data:
             report_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Generate PDF
-        pdf_bytes = generate_pdf_report(report_data)
-        
-        # Create response
-        response = make_response(pdf_bytes)
-        response.headers['Content-Type'] = 'application/pdf'
-        
+
+        # Remember the parsed analysis so /result?id=<analysis_id> works
+        # without carrying the payload in the URL
+        _remember_result(report_data['analysis_id'], report_data)
+
+        # Generate PDF off the event loop - doc.build is CPU-bound
+        pdf_buffer = await asyncio.to_thread(generate_pdf_report, report_data)
+
         # Create filename
         assignment_name = report_data.get('assignment', 'analysis').replace(' ', '_')
         filename = f"RUBRIX_Report_{assignment_name}_{report_data.get('overall_score', 'score')}.pdf"
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        
+
+        # send_file serves the buffer without copying the PDF bytes again
+        # and sets Content-Disposition itself via download_name - no need
+        # to rebuild the response just to patch headers
+        response = send_file(pdf_buffer, mimetype='application/pdf',
+                             as_attachment=True, download_name=filename, max_age=0)
+        # Hand the server-minted id back so the client can build the
+        # /result?id= link for this stored analysis
+        response.headers['X-Analysis-Id'] = report_data['analysis_id']
         return response
         
     except Exception as e:
         print(f"PDF generation error: {e}")
-        return jsonify({
-            'success': False,
-            'error': f'PDF generation failed: {str(e)}'
-        }), 500
+        return Response(
+            orjson.dumps({'success': False, 'error': f'PDF generation failed: {str(e)}'}),
+            status=500,
+            mimetype='application/json'
+        )
+
+# Both bodies below are constant apart from the /api/status timestamp, so
+# they are serialized once at import; the hot path is a byte concatenation
+_STATUS_BODY_PREFIX = orjson.dumps({
+    'status': 'online',
+    'service': 'RUBRIX AI Assignment Evaluator',
+    'version': '1.0',
+    'ai_provider': 'OpenRouter',
+    'free_models_available': len(FREE_MODELS),
+    'strict_evaluation_mode': True,
+    'pdf_generation': True
+})[:-1] + b',"timestamp":'
+
+_HEALTH_BODY = orjson.dumps({
+    'status': 'ok',
+    'ai_provider': 'OpenRouter',
+    'free_models_available': len(FREE_MODELS),
+    'upload_folder_exists': _UPLOAD_FOLDER_EXISTS,
+    'pdf_generation': True
+})
 
 @app.route('/api/status')
 def api_status():
     """API status endpoint"""
-    return jsonify({
-        'status': 'online',
-        'service': 'RUBRIX AI Assignment Evaluator',
-        'version': '1.0',
-        'ai_provider': 'OpenRouter',
-        'free_models_available': len(FREE_MODELS),
-        'strict_evaluation_mode': True,
-        'pdf_generation': True,
-        'timestamp': datetime.now().isoformat()
-    })
+    return Response(
+        _STATUS_BODY_PREFIX + orjson.dumps(datetime.now().isoformat()) + b'}',
+        mimetype='application/json'
+    )
 
 @app.route('/health')
 def health_check():
-    return jsonify({
-        'status': 'ok',
-        'ai_provider': 'OpenRouter',
-        'free_models_available': len(FREE_MODELS),
-        'upload_folder_exists': os.path.exists(app.config['UPLOAD_FOLDER']),
-        'pdf_generation': True
-    })
+    return Response(_HEALTH_BODY, mimetype='application/json')
+
+@app.route('/metrics')
+def metrics():
+    """Cache hit/miss and LLM concurrency counters"""
+    return jsonify(llm_stats)
 
 @app.route('/test-ai')
-def test_ai():
+async def test_ai():
     """Test the AI connection with strict prompt"""
     try:
-        test_result = analyze_with_openrouter(
+        test_result = await analyze_with_openrouter(
             "Sample assignment: Write a critical analysis of renewable energy adoption in developing countries. Discuss economic, social, and environmental factors, and propose policy recommendations.",
             "Rubric: Critical Analysis (40% weight): Depth of analysis, use of evidence, consideration of multiple perspectives. Policy Recommendations (30% weight): Feasibility, innovation, evidence-based. Structure and Clarity (20% weight): Organization, writing quality. Research and Citations (10% weight): Use of sources, proper citation."
         )
         
-        parsed_result = json.loads(test_result) if isinstance(test_result, str) else test_result
+        # analyze_with_openrouter returns JSON bytes on every path now,
+        # so no type sniffing is needed
+        parsed_result = orjson.loads(test_result)
         return jsonify({
             "success": True,
             "strict_mode": True,
@@ -797,7 +1376,9 @@ if __name__ == '__main__':
     print("📄 PDF Reports: Click 'Download Detailed Report' for PDF")
     print("="*50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Debug (and the reloader that comes with it) is opt-in; production
+    # runs behind gunicorn via gunicorn_conf.py instead of app.run
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)
 # import os
 # import json
 # import uuid
@@ -1103,7 +1684,7 @@ if __name__ == '__main__':
             
 #             # Parse response
 #             try:
-#                 analysis_data = json.loads(analysis_result)
+#                 analysis_data = orjson.loads(analysis_result)
 #                 return jsonify({
 #                     'success': True,
 #                     'analysis': analysis_data
@@ -1152,7 +1733,7 @@ if __name__ == '__main__':
             
 #             # Parse response
 #             try:
-#                 analysis_data = json.loads(analysis_result)
+#                 analysis_data = orjson.loads(analysis_result)
 #             except json.JSONDecodeError as e:
 #                 print(f"JSON parse error: {e}")
 #                 analysis_data = {
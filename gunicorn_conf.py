@@ -0,0 +1,19 @@
+import os
+
+# Threaded workers: the app's views are async and the heavy lifting (LLM
+# calls, PDF builds) is already offloaded, so threads per worker buys
+# concurrency without the memory cost of more processes.
+# Must exceed MAX_INFLIGHT_LLM_CALLS + MAX_PENDING_LLM_CALLS (app.py) with
+# room to spare, or every thread could be parked inside /analyze and the
+# app's own 503 load shedding would be unreachable
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = (2 * os.cpu_count()) + 1
+worker_class = 'gthread'
+threads = 16
+
+# Hold connections open between requests - the frontend fires /analyze and
+# /download-pdf back to back on the same page
+keepalive = 30
+
+# LLM calls can legitimately take most of the httpx 45s timeout
+timeout = 90